@@ -0,0 +1,117 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import todo  # noqa: E402
+
+
+def make_todo(todo_id, task):
+    return {
+        "id": todo_id,
+        "task": task,
+        "done": False,
+        "created_at": "2024-01-01 00:00:00",
+        "completed_at": None,
+    }
+
+
+def add_record(todo_id, task):
+    return {"op": "add", "todo": make_todo(todo_id, task)}
+
+
+class ChangeLogTest(unittest.TestCase):
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        patcher = mock.patch.object(todo, "warn")
+        self.warn = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.tmp)
+
+    def tasks(self):
+        return [(t["id"], t["task"], t["done"]) for t in todo.load_todos()]
+
+    def test_replays_log_over_snapshot(self):
+        todo.save_todos([make_todo(1, "a")])
+        todo.commit_changes([], [add_record(2, "b"), add_record(3, "c")])
+        todo.commit_changes([], [{"op": "complete", "ids": [2], "ts": "now"}])
+        todo.commit_changes([], [{"op": "update", "id": 3, "task": "C"}])
+        todo.commit_changes([], [{"op": "remove", "ids": [1]}])
+
+        self.assertEqual(self.tasks(), [(2, "b", True), (3, "C", False)])
+        self.warn.assert_not_called()
+
+    def test_compaction_writes_next_generation_and_drops_log(self):
+        todo.commit_changes([], [add_record(1, "a")])
+        with mock.patch.object(todo, "LOG_COMPACT_MIN_BYTES", 0):
+            todo.commit_changes([make_todo(1, "a")], [add_record(1, "a")])
+
+        self.assertFalse(os.path.exists(todo.LOG_FILE))
+        self.assertEqual(todo.snapshot_generation(), 1)
+        self.assertEqual(self.tasks(), [(1, "a", False)])
+
+    def test_append_after_torn_tail_keeps_new_records(self):
+        todo.commit_changes([], [add_record(1, "a")])
+        with open(todo.LOG_FILE, "ab") as f:
+            f.write(b'{"op":"add","todo":{"id":2,"ta')
+
+        todo.commit_changes([], [add_record(2, "b")])
+
+        self.assertEqual(self.tasks(), [(1, "a", False), (2, "b", False)])
+
+    def test_log_survives_copying_the_directory(self):
+        todo.commit_changes([], [add_record(1, "one"), add_record(2, "two")])
+        copy = os.path.join(self.tmp, "copy")
+        os.mkdir(copy)
+        for name in os.listdir(self.tmp):
+            if name != "copy":
+                shutil.copy2(name, copy)
+        os.chdir(copy)
+
+        self.assertEqual(self.tasks(), [(1, "one", False), (2, "two", False)])
+        self.assertTrue(os.path.exists(todo.LOG_FILE))
+
+    def test_unmatched_log_is_kept_and_not_applied(self):
+        todo.save_todos([make_todo(1, "a")])
+        todo.commit_changes([], [add_record(2, "b")])
+        # Restore an older snapshot, as a backup or checkout would.
+        with open(todo.DATA_FILE, "w", encoding="utf-8") as f:
+            f.write("[]")
+
+        self.assertEqual(self.tasks(), [])
+        self.assertTrue(os.path.exists(todo.LOG_FILE))
+        self.warn.assert_called_once()
+
+        todo.commit_changes([], [add_record(1, "new")])
+        orphans = [name for name in os.listdir() if name.endswith(".orphaned")]
+        self.assertEqual(len(orphans), 1)
+        self.assertEqual(self.tasks(), [(1, "new", False)])
+
+    def test_interrupted_save_does_not_duplicate_tasks(self):
+        todo.commit_changes([], [add_record(1, "a"), add_record(2, "b")])
+        todos = todo.load_todos()
+        real_remove = os.remove
+
+        def fail_on_log(path):
+            if path == todo.LOG_FILE:
+                raise OSError("interrupted")
+            real_remove(path)
+
+        with mock.patch.object(os, "remove", fail_on_log):
+            with self.assertRaises(OSError):
+                todo.save_todos(todos)
+
+        self.assertEqual(self.tasks(), [(1, "a", False), (2, "b", False)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,30 +1,72 @@
-import argparse
+import collections
+import functools
+import hashlib
 import json
+import mmap
+import os
+import re
+import shlex
+import stat
 import sys
+import tempfile
+import time
 from datetime import datetime
-from rich.console import Console
-from rich.table import Table
-from rich.text import Text
 
-console = Console()
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 DATA_FILE = "todo_list.json"
+LOG_FILE = "todo_list.log.jsonl"
+LOG_COMPACT_MIN_BYTES = 64 * 1024
+RENDER_CACHE_FILE = ".todo_list.cache"
+SHELL_SAVE_EVERY = 20
+# Set TODO_DENSE_IDS=1 to renumber tasks 1..N after every removal.
+DENSE_IDS = os.environ.get("TODO_DENSE_IDS") == "1"
+GENERATION_PATTERN = re.compile(rb'\{\s*"generation":\s*(\d+)')
+TODO_FIELDS = ("id", "task", "done", "created_at", "completed_at")
+
+
+@functools.lru_cache(maxsize=None)
+def get_console():
+    """Returns the shared Rich console, importing Rich on first use."""
+    from rich.console import Console
+
+    return Console()
+
+
+def default_file_mode():
+    """Returns the permissions open() would give a new file under the umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def current_timestamp():
+    """Returns the current local time in the format stored in the list."""
+    return f"{datetime.now():%Y-%m-%d %H:%M:%S}"
+
+
+class InvalidValueError(Exception):
+    """Raised when a command argument has an invalid value."""
 
 
 def valid_positive_integer(value):
     """Checks if the value is a positive integer."""
     try:
         ivalue = int(value)
-        if ivalue < 1:
-            raise argparse.ArgumentTypeError(
-                f"Value must be a positive integer, got {value}"
-            )
-        return ivalue
     except ValueError:
-        raise argparse.ArgumentTypeError(f"Value must be an integer, got {value}")
+        raise InvalidValueError(f"Value must be an integer, got {value}")
+    if ivalue < 1:
+        raise InvalidValueError(f"Value must be a positive integer, got {value}")
+    return ivalue
 
 
 def get_parser():
     """Creates and returns the argument parser."""
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="To-do List Manager", epilog="Use one command at a time."
     )
@@ -88,45 +130,461 @@ def get_parser():
         help="Repeats a task a given number of times",
     )
 
+    parser.add_argument(
+        "--shell",
+        action="store_true",
+        help="Starts an interactive session that keeps the list in memory",
+    )
+
     return parser
 
 
+def decode_json(data):
+    """Parses JSON from bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_json(value):
+    """Serializes a value to compact single-line UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def load_snapshot():
+    """Parses the JSON snapshot, memory-mapping it when orjson is available.
+
+    orjson parses straight from the mapped pages, so the file is never copied
+    into an intermediate bytes object.
+    """
+    with open(DATA_FILE, "rb") as f:
+        if orjson is None:
+            snapshot = json.loads(f.read())
+        else:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped.
+                return []
+            with mapped, memoryview(mapped) as view:
+                snapshot = orjson.loads(view)
+    # Older snapshots are a bare list of todos.
+    return snapshot["todos"] if isinstance(snapshot, dict) else snapshot
+
+
+def snapshot_generation():
+    """Returns the generation stored at the start of the snapshot.
+
+    Every save_todos increments it. Missing snapshots and older ones without a
+    generation count as generation 0.
+    """
+    try:
+        with open(DATA_FILE, "rb") as f:
+            head = f.read(64)
+    except FileNotFoundError:
+        return 0
+    match = GENERATION_PATTERN.match(head)
+    return int(match.group(1)) if match else 0
+
+
+def log_matches(first_line, generation):
+    """Checks whether a log's base record names the given snapshot generation."""
+    try:
+        base = decode_json(first_line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return False
+    return base == {"op": "base", "generation": generation}
+
+
+def warn(message):
+    """Prints a warning."""
+    get_console().print(f"[bold yellow]Warning:[/bold yellow] {message}")
+
+
 def load_todos():
-    """Loads the to-do list from a JSON file."""
+    """Loads the to-do list from the JSON snapshot and replays the change log.
+
+    The log starts with a "base" record naming the snapshot generation it
+    applies to. A log for any other generation (e.g. after restoring an older
+    todo_list.json) is left untouched and not applied.
+    """
+    generation = snapshot_generation()
     try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+        todos = load_snapshot()
+    except FileNotFoundError:
+        todos = []
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        todos = []
+
+    try:
+        with open(LOG_FILE, "rb") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return todos
+    if not lines:
+        return todos
+    if not log_matches(lines[0], generation):
+        warn(
+            f"{LOG_FILE} does not belong to generation {generation} of "
+            f"{DATA_FILE}, so its changes were not applied."
+        )
+        return todos
+
+    index = {todo["id"]: todo for todo in todos}
+    for line in lines[1:]:
+        try:
+            record = decode_json(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            # A line torn by an interrupted append; commit_changes starts the
+            # next record on a new line.
+            continue
+        apply_record(todos, index, record)
+    return todos
+
+
+def apply_record(todos, index, record):
+    """Applies a single change log record to the list without printing."""
+    op = record["op"]
+    if op == "add":
+        todo = record["todo"]
+        todos.append(todo)
+        index[todo["id"]] = todo
+    elif op == "remove":
+        removed = {todo_id for todo_id in record["ids"] if todo_id in index}
+        if removed:
+            todos[:] = [todo for todo in todos if todo["id"] not in removed]
+            for todo_id in removed:
+                del index[todo_id]
+    elif op == "remove_all":
+        del todos[:]
+        index.clear()
+    elif op == "complete":
+        for todo_id in record["ids"]:
+            todo = index.get(todo_id)
+            if todo and not todo["done"]:
+                todo["done"] = True
+                todo["completed_at"] = record["ts"]
+    elif op == "complete_all":
+        for todo in todos:
+            if not todo["done"]:
+                todo["done"] = True
+                todo["completed_at"] = record["ts"]
+    elif op == "pending":
+        for todo_id in record["ids"]:
+            todo = index.get(todo_id)
+            if todo:
+                todo["done"] = False
+                todo["completed_at"] = None
+    elif op == "pending_all":
+        for todo in todos:
+            if todo["done"]:
+                todo["done"] = False
+                todo["completed_at"] = None
+    elif op == "renumber":
+        renumber_todos(todos, index)
+    elif op == "update":
+        todo = index.get(record["id"])
+        if todo:
+            todo["task"] = record["task"]
+
+
+def encode_todo(todo):
+    """Encodes a todo with the fixed schema as it appears in the snapshot."""
+    encode_string = json.encoder.encode_basestring
+    completed_at = todo["completed_at"]
+    return (
+        f'    {{\n      "id": {todo["id"]:d},\n'
+        f'      "task": {encode_string(todo["task"])},\n'
+        f'      "done": {"true" if todo["done"] else "false"},\n'
+        f'      "created_at": {encode_string(todo["created_at"])},\n'
+        f'      "completed_at": '
+        f'{"null" if completed_at is None else encode_string(completed_at)}\n    }}'
+    )
+
+
+def dump_todos(todos, generation):
+    """Serializes the snapshot object to UTF-8 encoded JSON bytes.
+
+    The generation is written first so snapshot_generation can read it from
+    the start of the file. Without orjson, lists that only hold TODO_FIELDS
+    records go through the specialized encode_todo, avoiding the slow
+    pure-Python indenting encoder.
+    """
+    snapshot = {"generation": generation, "todos": todos}
+    if orjson is not None:
+        return orjson.dumps(
+            snapshot, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        )
+    if todos and all(tuple(todo) == TODO_FIELDS for todo in todos):
+        body = ",\n".join(encode_todo(todo) for todo in todos)
+        return (
+            f'{{\n  "generation": {generation:d},\n  "todos": [\n{body}\n  ]\n}}'
+        ).encode("utf-8")
+    return json.dumps(snapshot, ensure_ascii=False, indent=2).encode("utf-8")
 
 
 def save_todos(todos):
-    """Saves the to-do list to a JSON file."""
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(todos, f, ensure_ascii=False, indent=2)
+    """Saves the to-do list to a JSON file atomically with a single fsync.
+
+    The snapshot gets the next generation and then holds every change, so the
+    change log is discarded.
+    """
+    generation = snapshot_generation() + 1
+    target = os.path.realpath(DATA_FILE)
+    try:
+        mode = stat.S_IMODE(os.stat(target).st_mode)
+    except FileNotFoundError:
+        mode = default_file_mode()
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=os.path.dirname(target), suffix=".tmp", delete=False
+    ) as f:
+        try:
+            f.write(dump_todos(todos, generation))
+            os.chmod(f.name, mode)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, target)
+    try:
+        os.remove(LOG_FILE)
+    except FileNotFoundError:
+        pass
 
 
-def find_todo_by_id(todos, todo_id):
+def set_aside_unmatched_log(generation):
+    """Renames a log that belongs to another snapshot generation out of the way.
+
+    Such a log is never applied, but it is kept so no changes are lost.
+    """
+    try:
+        with open(LOG_FILE, "rb") as f:
+            first_line = f.readline()
+    except FileNotFoundError:
+        return
+    if first_line and not log_matches(first_line, generation):
+        orphan = f"{LOG_FILE}.{time.time_ns()}.orphaned"
+        os.replace(LOG_FILE, orphan)
+        warn(f"Moved {LOG_FILE}, which was not applied, to {orphan}.")
+
+
+def commit_changes(todos, records):
+    """Durably records changes, appending to the log instead of rewriting.
+
+    Once the log grows larger than the snapshot (and LOG_COMPACT_MIN_BYTES),
+    it is compacted by writing a fresh snapshot.
+    """
+    if not records:
+        return
+    generation = snapshot_generation()
+    set_aside_unmatched_log(generation)
+    with open(LOG_FILE, "a+b") as f:
+        log_size = f.seek(0, os.SEEK_END)
+        data = b"".join(encode_json(record) + b"\n" for record in records)
+        if log_size == 0:
+            data = encode_json({"op": "base", "generation": generation}) + b"\n" + data
+        else:
+            f.seek(log_size - 1)
+            if f.read(1) != b"\n":
+                # End a line torn by an interrupted append so the new records
+                # are not glued onto it.
+                data = b"\n" + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+        log_size = f.tell()
+
+    try:
+        snapshot_size = os.path.getsize(DATA_FILE)
+    except OSError:
+        snapshot_size = 0
+    if log_size > max(snapshot_size, LOG_COMPACT_MIN_BYTES):
+        save_todos(todos)
+
+
+def build_index(todos):
+    """Builds an ID to todo item mapping for constant-time lookups.
+
+    This is used with TODO_DENSE_IDS=1 too: a dict.get on a small int is
+    faster than a bounds-checked list lookup, and building the dict is a small
+    part of loading the list.
+    """
+    return {todo["id"]: todo for todo in todos}
+
+
+def find_todo_by_id(index, todo_id):
     """Finds a todo item with the specified ID."""
-    return next((todo for todo in todos if todo["id"] == todo_id), None)
+    return index.get(todo_id)
+
+
+def trigrams(lowered):
+    """Returns the set of three-character substrings of lowered.
+
+    This does not change case: callers must pass text that is already
+    lowercased, or the search index becomes case-sensitive.
+    """
+    return {lowered[i : i + 3] for i in range(len(lowered) - 2)}
+
+
+SearchIndex = collections.namedtuple("SearchIndex", "grams lowered")
+
+
+def build_search_index(todos):
+    """Builds an in-memory index of trigram -> task IDs and ID -> lowered task."""
+    search_index = SearchIndex({}, {})
+    for todo in todos:
+        index_task(search_index, todo["id"], todo["task"])
+    return search_index
+
+
+def index_task(search_index, todo_id, task):
+    """Adds a task to the search index."""
+    lowered = task.lower()
+    search_index.lowered[todo_id] = lowered
+    for gram in trigrams(lowered):
+        search_index.grams.setdefault(gram, set()).add(todo_id)
 
 
-def list_todos(todos, filter_status=None, search_term=None):
-    """Lists to-do items based on filters and search term."""
+def unindex_task(search_index, todo_id):
+    """Removes a task from the search index."""
+    lowered = search_index.lowered.pop(todo_id, None)
+    if lowered is None:
+        return
+    for gram in trigrams(lowered):
+        ids = search_index.grams[gram]
+        ids.discard(todo_id)
+        if not ids:
+            del search_index.grams[gram]
+
+
+def update_search_index(search_index, todos, records):
+    """Keeps the search index in step with the change log records of a command."""
+    for record in records:
+        op = record["op"]
+        if op == "add":
+            index_task(search_index, record["todo"]["id"], record["todo"]["task"])
+        elif op == "remove":
+            for todo_id in record["ids"]:
+                unindex_task(search_index, todo_id)
+        elif op == "update":
+            unindex_task(search_index, record["id"])
+            index_task(search_index, record["id"], record["task"])
+        elif op in ("remove_all", "renumber"):
+            search_index.grams.clear()
+            search_index.lowered.clear()
+            for todo in todos:
+                index_task(search_index, todo["id"], todo["task"])
+
+
+def search_candidates(search_index, term):
+    """Returns the IDs of tasks that may contain term, or None if unknown.
+
+    Terms shorter than three characters have no trigrams and need a full scan.
+    """
+    query = trigrams(term)
+    if not query:
+        return None
+    grams = search_index.grams
+    candidates = None
+    for gram in sorted(query, key=lambda g: len(grams.get(g, ()))):
+        ids = grams.get(gram)
+        if not ids:
+            return set()
+        candidates = set(ids) if candidates is None else candidates & ids
+        if not candidates:
+            return candidates
+    return candidates
+
+
+def render_cache_key(console, rows):
+    """Returns a stable key for a rendered table of rows on this console."""
+    settings = (
+        console.width,
+        console.color_system,
+        console.is_terminal,
+        console.encoding,
+        console.no_color,
+        console.legacy_windows,
+    )
+    return hashlib.sha1(repr((settings, rows)).encode("utf-8")).hexdigest()
+
+
+def read_render_cache(key):
+    """Returns the cached rendering for key, or None on a cache miss."""
+    try:
+        with open(RENDER_CACHE_FILE, "r", encoding="utf-8") as f:
+            cached_key = f.readline().rstrip("\n")
+            if cached_key == key:
+                return f.read()
+    except (OSError, UnicodeDecodeError):
+        pass
+    return None
+
+
+def write_render_cache(key, rendered):
+    """Stores the last rendered table so an identical listing can reuse it.
+
+    The cache is replaced atomically, so a failed write never leaves a valid
+    key in front of a truncated table.
+    """
+    cache_dir = os.path.dirname(os.path.abspath(RENDER_CACHE_FILE))
+    try:
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=cache_dir, suffix=".tmp", delete=False
+        ) as f:
+            try:
+                f.write(f"{key}\n{rendered}")
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, RENDER_CACHE_FILE)
+    except OSError:
+        pass
+
+
+def list_todos(
+    todos, filter_status=None, search_term=None, search_index=None, use_cache=False
+):
+    """Lists to-do items based on filters and search term.
+
+    When a search_index is given, only tasks sharing every trigram of the
+    search term are checked, against their already lowercased names.
+
+    With use_cache, the rendered table is cached on disk, keyed by the
+    displayed rows and the console settings, so repeating the same listing
+    skips building the table. Only the --list commands use it; the list shown
+    after a change would never hit the cache and only cost a rewrite.
+    """
+    console = get_console()
     if not todos:
         console.print("[bold yellow]To-do list is empty.[/bold yellow]")
         return
 
-    filtered_todos = todos
-    if filter_status == "completed":
-        filtered_todos = [todo for todo in filtered_todos if todo["done"]]
-    elif filter_status == "pending":
-        filtered_todos = [todo for todo in filtered_todos if not todo["done"]]
-
-    if search_term:
-        search_term = search_term.lower()
+    want_done = {"completed": True, "pending": False}.get(filter_status)
+    term = search_term.lower() if search_term else None
+    if term and search_index is not None:
+        candidate_ids = search_candidates(search_index, term)
+        lowered = search_index.lowered
+        filtered_todos = [
+            todo
+            for todo in todos
+            if (candidate_ids is None or todo["id"] in candidate_ids)
+            and (want_done is None or todo["done"] is want_done)
+            and term in lowered[todo["id"]]
+        ]
+    else:
+        # A one-shot search lowers each name once anyway, so caching the
+        # lowered names would cost more than it saves.
         filtered_todos = [
-            todo for todo in filtered_todos if search_term in todo["task"].lower()
+            todo
+            for todo in todos
+            if (want_done is None or todo["done"] is want_done)
+            and (term is None or term in todo["task"].lower())
         ]
 
     if not filtered_todos:
@@ -135,246 +593,491 @@ def list_todos(todos, filter_status=None, search_term=None):
         )
         return
 
-    table = Table()
-    table.add_column("ID", style="cyan", no_wrap=True)
-    table.add_column("Task", style="magenta")
-    table.add_column("Status", style="green")
-    table.add_column("Created At", style="blue")
-    table.add_column("Completed At", style="yellow")
-    for todo in filtered_todos:
-        status_text = (
-            Text("Completed", style="bold green")
-            if todo["done"]
-            else Text("Pending", style="bold red")
-        )
-        completed_at_text = todo.get("completed_at", "") if todo["done"] else ""
-        table.add_row(
+    rows = [
+        (
             str(todo["id"]),
             todo["task"],
-            status_text,
+            todo["done"],
             todo["created_at"],
-            completed_at_text,
+            todo.get("completed_at", "") if todo["done"] else "",
         )
-    console.print(table)
+        for todo in filtered_todos
+    ]
+    rendered = None
+    if use_cache:
+        key = render_cache_key(console, rows)
+        rendered = read_render_cache(key)
+    if rendered is None:
+        from rich.table import Table
+        from rich.text import Text
+
+        table = Table()
+        table.add_column("ID", style="cyan", no_wrap=True)
+        table.add_column("Task", style="magenta")
+        table.add_column("Status", style="green")
+        table.add_column("Created At", style="blue")
+        table.add_column("Completed At", style="yellow")
+        for todo_id, task, done, created_at, completed_at_text in rows:
+            status_text = (
+                Text("Completed", style="bold green")
+                if done
+                else Text("Pending", style="bold red")
+            )
+            table.add_row(todo_id, task, status_text, created_at, completed_at_text)
+        with console.capture() as capture:
+            console.print(table)
+        rendered = capture.get()
+        if use_cache:
+            write_render_cache(key, rendered)
+    console.file.write(rendered)
 
 
-def add_todos(todos, new_tasks):
+def add_todos(todos, index, new_tasks):
     """Adds one or more new tasks to the list, handling duplicate names."""
+    names = {todo["task"] for todo in todos}
+    max_id = max((todo["id"] for todo in todos), default=0)
+    created_at = current_timestamp()
+    messages = []
     for new_task_name in new_tasks:
         original_task_name = new_task_name
         task_name_to_add = new_task_name
         counter = 1
 
-        while any(todo["task"] == task_name_to_add for todo in todos):
+        while task_name_to_add in names:
             task_name_to_add = f"{original_task_name} ({counter})"
             counter += 1
+        names.add(task_name_to_add)
 
-        new_id = max((todo["id"] for todo in todos), default=0) + 1
+        max_id += 1
+        new_id = max_id
         new_todo = {
             "id": new_id,
             "task": task_name_to_add,
             "done": False,
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "created_at": created_at,
             "completed_at": None,
         }
         todos.append(new_todo)
-        console.print(f'[bold green]Added task:[/bold green] "{task_name_to_add}"')
+        index[new_id] = new_todo
+        messages.append(f'[bold green]Added task:[/bold green] "{task_name_to_add}"')
+    get_console().print("\n".join(messages))
 
 
-def repeat_task(todos, todo_id, repeat_count):
+def repeat_task(todos, index, todo_id, repeat_count):
     """Repeats a specified task a given number of times."""
-    original_todo = find_todo_by_id(todos, todo_id)
+    original_todo = find_todo_by_id(index, todo_id)
     if not original_todo:
-        console.print(f"[bold red]Task with ID {todo_id} not found.[/bold red]")
+        get_console().print(f"[bold red]Task with ID {todo_id} not found.[/bold red]")
         return False
 
     tasks_to_add = [original_todo["task"]] * repeat_count
-    add_todos(todos, tasks_to_add)
-    console.print(
+    add_todos(todos, index, tasks_to_add)
+    get_console().print(
         f'[bold green]Task "{original_todo["task"]}" repeated {repeat_count} times.[/bold green]'
     )
     return True
 
 
-def remove_todo(todos, todo_id):
-    """Removes a task by its ID."""
-    todo_to_remove = find_todo_by_id(todos, todo_id)
-    if todo_to_remove:
-        todos.remove(todo_to_remove)
-        console.print(
-            f'[bold green]Removed task:[/bold green] "{todo_to_remove["task"]}"'
-        )
-        return True
-    else:
-        console.print(f"[bold red]Task with ID {todo_id} not found.[/bold red]")
-        return False
+def remove_todos(todos, index, todo_ids):
+    """Removes tasks by their IDs with a single pass over the list.
+
+    Returns an (action_taken, messages) pair with one message per given ID.
+    """
+    messages = []
+    removed_ids = set()
+    for todo_id in todo_ids:
+        todo_to_remove = index.pop(todo_id, None)
+        if todo_to_remove:
+            removed_ids.add(todo_id)
+            messages.append(
+                f'[bold green]Removed task:[/bold green] "{todo_to_remove["task"]}"'
+            )
+        else:
+            messages.append(f"[bold red]Task with ID {todo_id} not found.[/bold red]")
+
+    if removed_ids:
+        todos[:] = [todo for todo in todos if todo["id"] not in removed_ids]
+    return bool(removed_ids), messages
+
+
+def renumber_todos(todos, index):
+    """Renumbers tasks so their IDs are 1..N in list order."""
+    for position, todo in enumerate(todos, 1):
+        todo["id"] = position
+    index.clear()
+    index.update({todo["id"]: todo for todo in todos})
 
 
-def remove_all_todos(todos):
+def remove_all_todos(todos, index):
     """Removes all tasks from the list."""
     if not todos:
-        console.print("[bold yellow]To-do list is already empty.[/bold yellow]")
+        get_console().print("[bold yellow]To-do list is already empty.[/bold yellow]")
         return False
 
     del todos[:]
-    console.print("[bold green]All tasks have been removed.[/bold green]")
+    index.clear()
+    get_console().print("[bold green]All tasks have been removed.[/bold green]")
     return True
 
 
-def complete_todo(todos, todo_id):
-    """Marks a task as completed by its ID."""
-    todo_to_update = find_todo_by_id(todos, todo_id)
+def complete_todo(index, todo_id, completed_at=None):
+    """Marks a task as completed by its ID.
+
+    Batched callers can pass a precomputed completed_at timestamp to share it.
+    Returns an (action_taken, message) pair so batches can print at once.
+    """
+    todo_to_update = find_todo_by_id(index, todo_id)
     if todo_to_update:
         if not todo_to_update["done"]:
             todo_to_update["done"] = True
-            todo_to_update["completed_at"] = datetime.now().strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            console.print(
-                f'[bold green]Task "{todo_to_update["task"]}" marked as completed.[/bold green]'
-            )
+            todo_to_update["completed_at"] = completed_at or current_timestamp()
+            message = f'[bold green]Task "{todo_to_update["task"]}" marked as completed.[/bold green]'
         else:
-            console.print(
-                f'[bold yellow]Task "{todo_to_update["task"]}" is already completed.[/bold yellow]'
-            )
-        return True
+            message = f'[bold yellow]Task "{todo_to_update["task"]}" is already completed.[/bold yellow]'
+        return True, message
     else:
-        console.print(f"[bold red]Task with ID {todo_id} not found.[/bold red]")
-        return False
+        message = f"[bold red]Task with ID {todo_id} not found.[/bold red]"
+        return False, message
 
 
-def complete_all_todos(todos):
+def complete_all_todos(todos, completed_at=None):
     """Marks all tasks as completed."""
     if not todos:
-        console.print(
+        get_console().print(
             "[bold yellow]To-do list is empty. No tasks to complete.[/bold yellow]"
         )
         return False
 
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    now = completed_at or current_timestamp()
+    changed = False
     for todo in todos:
         if not todo["done"]:
             todo["done"] = True
             todo["completed_at"] = now
-    console.print("[bold green]All tasks have been marked as completed.[/bold green]")
+            changed = True
+    if not changed:
+        get_console().print(
+            "[bold yellow]All tasks are already completed.[/bold yellow]"
+        )
+        return False
+    get_console().print(
+        "[bold green]All tasks have been marked as completed.[/bold green]"
+    )
     return True
 
 
-def pending_todo(todos, todo_id):
-    """Marks a task as pending by its ID."""
-    todo_to_update = find_todo_by_id(todos, todo_id)
+def pending_todo(index, todo_id):
+    """Marks a task as pending by its ID.
+
+    Returns an (action_taken, message) pair so batches can print at once.
+    """
+    todo_to_update = find_todo_by_id(index, todo_id)
     if todo_to_update:
         if todo_to_update["done"]:
             todo_to_update["done"] = False
             todo_to_update["completed_at"] = None
-            console.print(
-                f'[bold green]Task "{todo_to_update["task"]}" marked as pending.[/bold green]'
-            )
+            message = f'[bold green]Task "{todo_to_update["task"]}" marked as pending.[/bold green]'
         else:
-            console.print(
-                f'[bold yellow]Task "{todo_to_update["task"]}" is already pending.[/bold yellow]'
-            )
-        return True
+            message = f'[bold yellow]Task "{todo_to_update["task"]}" is already pending.[/bold yellow]'
+        return True, message
     else:
-        console.print(f"[bold red]Task with ID {todo_id} not found.[/bold red]")
-        return False
+        message = f"[bold red]Task with ID {todo_id} not found.[/bold red]"
+        return False, message
 
 
 def pending_all_todos(todos):
     """Marks all tasks as pending."""
     if not todos:
-        console.print(
+        get_console().print(
             "[bold yellow]To-do list is empty. No tasks to mark as pending.[/bold yellow]"
         )
         return False
 
+    changed = False
     for todo in todos:
-        todo["done"] = False
-        todo["completed_at"] = None
-    console.print("[bold green]All tasks have been marked as pending.[/bold green]")
+        if todo["done"]:
+            todo["done"] = False
+            todo["completed_at"] = None
+            changed = True
+    if not changed:
+        get_console().print("[bold yellow]All tasks are already pending.[/bold yellow]")
+        return False
+    get_console().print(
+        "[bold green]All tasks have been marked as pending.[/bold green]"
+    )
     return True
 
 
-def update_todo(todos, todo_id, new_name):
+def update_todo(index, todo_id, new_name):
     """Updates a task's name by its ID."""
-    todo_to_update = find_todo_by_id(todos, todo_id)
+    todo_to_update = find_todo_by_id(index, todo_id)
     if todo_to_update:
         old_name = todo_to_update["task"]
         todo_to_update["task"] = new_name
-        console.print(
+        get_console().print(
             f'[bold green]Task name updated from "{old_name}" to "{new_name}".[/bold green]'
         )
         return True
     else:
-        console.print(f"[bold red]Task with ID {todo_id} not found.[/bold red]")
+        get_console().print(f"[bold red]Task with ID {todo_id} not found.[/bold red]")
         return False
 
 
+def run_batch(mutate, todo_ids):
+    """Applies mutate to each ID and prints all resulting messages at once."""
+    results = [mutate(todo_id) for todo_id in todo_ids]
+    get_console().print("\n".join(message for _, message in results))
+    return any(action_taken for action_taken, _ in results)
+
+
+def handle_list(todos, index, values, journal):
+    """Handles --list."""
+    list_todos(todos, use_cache=True)
+    return False
+
+
+def handle_list_completed(todos, index, values, journal):
+    """Handles --list-completed."""
+    list_todos(todos, filter_status="completed", use_cache=True)
+    return False
+
+
+def handle_list_pending(todos, index, values, journal):
+    """Handles --list-pending."""
+    list_todos(todos, filter_status="pending", use_cache=True)
+    return False
+
+
+def handle_search(todos, index, values, journal):
+    """Handles --search."""
+    list_todos(todos, search_term=values[0])
+    return False
+
+
+def handle_add(todos, index, values, journal):
+    """Handles --add."""
+    first_new = len(todos)
+    add_todos(todos, index, values)
+    journal.extend({"op": "add", "todo": dict(todo)} for todo in todos[first_new:])
+    return True
+
+
+def handle_remove(todos, index, values, journal):
+    """Handles --remove."""
+    action_taken, messages = remove_todos(todos, index, values)
+    get_console().print("\n".join(messages))
+    if action_taken:
+        journal.append({"op": "remove", "ids": values})
+        if DENSE_IDS:
+            renumber_todos(todos, index)
+            journal.append({"op": "renumber"})
+    return action_taken
+
+
+def handle_remove_all(todos, index, values, journal):
+    """Handles --remove-all."""
+    action_taken = remove_all_todos(todos, index)
+    if action_taken:
+        journal.append({"op": "remove_all"})
+    return action_taken
+
+
+def handle_complete(todos, index, values, journal):
+    """Handles --complete."""
+    now = current_timestamp()
+    action_taken = run_batch(lambda todo_id: complete_todo(index, todo_id, now), values)
+    if action_taken:
+        journal.append({"op": "complete", "ids": values, "ts": now})
+    return action_taken
+
+
+def handle_complete_all(todos, index, values, journal):
+    """Handles --complete-all."""
+    now = current_timestamp()
+    action_taken = complete_all_todos(todos, now)
+    if action_taken:
+        journal.append({"op": "complete_all", "ts": now})
+    return action_taken
+
+
+def handle_pending(todos, index, values, journal):
+    """Handles --pending."""
+    action_taken = run_batch(lambda todo_id: pending_todo(index, todo_id), values)
+    if action_taken:
+        journal.append({"op": "pending", "ids": values})
+    return action_taken
+
+
+def handle_pending_all(todos, index, values, journal):
+    """Handles --pending-all."""
+    action_taken = pending_all_todos(todos)
+    if action_taken:
+        journal.append({"op": "pending_all"})
+    return action_taken
+
+
+def handle_update(todos, index, values, journal):
+    """Handles --update, validating the task ID."""
+    todo_id = valid_positive_integer(values[0])
+    action_taken = update_todo(index, todo_id, values[1])
+    if action_taken:
+        journal.append({"op": "update", "id": todo_id, "task": values[1]})
+    return action_taken
+
+
+def handle_repeat(todos, index, values, journal):
+    """Handles --repeat, validating the task ID and count."""
+    todo_id = valid_positive_integer(values[0])
+    count = valid_positive_integer(values[1])
+    first_new = len(todos)
+    action_taken = repeat_task(todos, index, todo_id, count)
+    journal.extend({"op": "add", "todo": dict(todo)} for todo in todos[first_new:])
+    return action_taken
+
+
+Command = collections.namedtuple("Command", "nargs value_type handler")
+
+# Maps each flag to its command, in the order argparse results are resolved.
+COMMANDS = {
+    "--list": Command(0, str, handle_list),
+    "--list-completed": Command(0, str, handle_list_completed),
+    "--list-pending": Command(0, str, handle_list_pending),
+    "--search": Command(1, str, handle_search),
+    "--add": Command("+", str, handle_add),
+    "--remove": Command("+", int, handle_remove),
+    "--remove-all": Command(0, str, handle_remove_all),
+    "--complete": Command("+", int, handle_complete),
+    "--complete-all": Command(0, str, handle_complete_all),
+    "--pending": Command("+", int, handle_pending),
+    "--pending-all": Command(0, str, handle_pending_all),
+    "--update": Command(2, str, handle_update),
+    "--repeat": Command(2, str, handle_repeat),
+}
+
+
+def parse_command(argv):
+    """Parses the command line into a (flag, values) pair.
+
+    The common "one flag followed by its arguments" form is handled directly.
+    Anything else (--help, abbreviations, empty or invalid values) is handed to
+    argparse, which is only imported and built when needed.
+    """
+    if argv and argv[0] in COMMANDS:
+        flag, values = argv[0], argv[1:]
+        command = COMMANDS[flag]
+        count_ok = (
+            len(values) >= 1 if command.nargs == "+" else len(values) == command.nargs
+        )
+        if count_ok and all(value and value[0] != "-" for value in values):
+            try:
+                return flag, [command.value_type(value) for value in values]
+            except ValueError:
+                pass
+
+    args = get_parser().parse_args(argv)
+    for flag in COMMANDS:
+        value = getattr(args, flag[2:].replace("-", "_"))
+        if value is True:
+            return flag, []
+        if isinstance(value, str) and value:
+            return flag, [value]
+        if isinstance(value, list):
+            return flag, value
+    if args.shell:
+        return "--shell", []
+    return None, None
+
+
+def print_updated_list(todos):
+    """Prints the list after a command has changed it."""
+    get_console().print("\n[bold]Updated List:[/bold]")
+    list_todos(todos)
+
+
+def run_shell():
+    """Runs an interactive session over a single in-memory copy of the list.
+
+    The list and its index are loaded once, and changes are committed every
+    SHELL_SAVE_EVERY change records and when the session ends. A trigram
+    search index is built on the first --search and kept up to date from the
+    change records of later commands.
+    """
+    todos = load_todos()
+    index = build_index(todos)
+    search_index = None
+    journal = []
+    interactive = sys.stdin.isatty()
+
+    try:
+        while True:
+            try:
+                line = input("todo> " if interactive else "")
+            except EOFError:
+                break
+            try:
+                argv = shlex.split(line)
+            except ValueError as e:
+                get_console().print(f"[bold red]Error:[/bold red] {e}")
+                continue
+            if not argv:
+                continue
+            if argv[0] in ("exit", "quit"):
+                break
+
+            try:
+                flag, values = parse_command(argv)
+            except SystemExit:
+                continue
+            if flag is None or flag == "--shell":
+                get_parser().print_help()
+                continue
+
+            if flag == "--search":
+                if search_index is None:
+                    search_index = build_search_index(todos)
+                list_todos(todos, search_term=values[0], search_index=search_index)
+                continue
+
+            first_record = len(journal)
+            try:
+                action_taken = COMMANDS[flag].handler(todos, index, values, journal)
+            except InvalidValueError as e:
+                get_console().print(f"[bold red]Error:[/bold red] {e}")
+                continue
+            if search_index is not None:
+                update_search_index(search_index, todos, journal[first_record:])
+            if len(journal) >= SHELL_SAVE_EVERY:
+                commit_changes(todos, journal)
+                journal = []
+            if action_taken:
+                print_updated_list(todos)
+    finally:
+        commit_changes(todos, journal)
+
+
 def main():
     """Main function of the application."""
-    parser = get_parser()
-    args = parser.parse_args()
+    flag, values = parse_command(sys.argv[1:])
+    if flag is None:
+        get_parser().print_help()
+        return
+    if flag == "--shell":
+        run_shell()
+        return
+
     todos = load_todos()
+    index = build_index(todos)
+    journal = []
 
-    action_taken = False
-
-    if args.list:
-        list_todos(todos)
-    elif args.list_completed:
-        list_todos(todos, filter_status="completed")
-    elif args.list_pending:
-        list_todos(todos, filter_status="pending")
-    elif args.search:
-        list_todos(todos, search_term=args.search)
-    elif args.add:
-        add_todos(todos, args.add)
-        save_todos(todos)
-        action_taken = True
-    elif args.remove is not None:
-        for todo_id in args.remove:
-            action_taken = remove_todo(todos, todo_id) or action_taken
-        save_todos(todos)
-    elif args.remove_all:
-        action_taken = remove_all_todos(todos)
-        save_todos(todos)
-    elif args.complete is not None:
-        for todo_id in args.complete:
-            action_taken = complete_todo(todos, todo_id) or action_taken
-        save_todos(todos)
-    elif args.complete_all:
-        action_taken = complete_all_todos(todos)
-        save_todos(todos)
-    elif args.pending is not None:
-        for todo_id in args.pending:
-            action_taken = pending_todo(todos, todo_id) or action_taken
-        save_todos(todos)
-    elif args.pending_all:
-        action_taken = pending_all_todos(todos)
-        save_todos(todos)
-    elif args.update:
-        try:
-            todo_id = valid_positive_integer(args.update[0])
-            new_name = args.update[1]
-            action_taken = update_todo(todos, todo_id, new_name)
-            save_todos(todos)
-        except argparse.ArgumentTypeError as e:
-            console.print(f"[bold red]Error:[/bold red] {e}")
-            sys.exit(1)
-    elif args.repeat:
-        try:
-            todo_id = valid_positive_integer(args.repeat[0])
-            count = valid_positive_integer(args.repeat[1])
-            action_taken = repeat_task(todos, todo_id, count)
-            save_todos(todos)
-        except argparse.ArgumentTypeError as e:
-            console.print(f"[bold red]Error:[/bold red] {e}")
-            sys.exit(1)
-    else:
-        parser.print_help()
+    try:
+        action_taken = COMMANDS[flag].handler(todos, index, values, journal)
+    except InvalidValueError as e:
+        get_console().print(f"[bold red]Error:[/bold red] {e}")
+        sys.exit(1)
+    commit_changes(todos, journal)
 
     if action_taken:
-        console.print("\n[bold]Updated List:[/bold]")
-        list_todos(todos)
+        print_updated_list(todos)
 
 
 if __name__ == "__main__":